@@ -0,0 +1,211 @@
+# Analysis of a finished Cayley graph with NumPy: the full operation table of the quandle
+# and checks of the quandle axioms on it.
+# Elements are numbered 0, 1, ..., n-1, which is vertex 1, 2, ..., n of the graph written by
+# write_graph() (the live vertices of the graph, in order). The action of generator g is the
+# array G[g-1], with x ▷ g = G[g-1][x], and the operation table is T[x, y] = x ▷ y.
+#
+#   graph = cached_graph(gen, init, sec)        or GraphFile(path)
+#   G, generators = actions(graph)
+#   T, parent, labels = operation_table(G, generators)
+#   verify(T, G, generators, N=2)               {'idempotent': None, ...}, None where the axiom holds
+#   holds(G, generators, [[3,2,1,2,1,3,2]])     which relations [a, *word, b] hold, a ▷ word = b
+
+import itertools
+import numpy as np
+from collections import deque
+from cayley import edge_tables
+
+# The action of each generator as an int array of shape (gen, n), and the element of each
+# generator. graph is a finished CayleyGraph or a GraphFile.
+def actions(graph):
+    if hasattr(graph, 'dense_tables'): # a CayleyGraph
+        forward, generators = graph.dense_tables()
+    else:
+        forward = graph.as_numpy()
+        generators = graph.generators
+    G = np.array([np.asarray(t)[1:] for t in forward], dtype=np.int32) - 1
+    if (G < 0).any():
+        raise ValueError('the graph is not finished: some edges are missing')
+    return G, np.array(generators, dtype=np.int32) - 1
+
+# The same from the output of q_graph, (Vertices, Edges). The vertices are numbered in
+# order, and generators are the vertices of the generators, 1, ..., gen by default.
+# When generators merged, their vertices are not known from the edges alone; pass them,
+# or use actions() on the graph instead.
+def edge_actions(Vertices, Edges, gen, generators=None):
+    tables, index = edge_tables(Vertices, Edges, gen)
+    if generators is None:
+        generators = range(1, gen+1)
+    generators = list(generators)
+    if any(v not in index for v in generators):
+        raise ValueError('some generators merged, pass their vertices as generators')
+    G = np.array([np.asarray(t)[1:] for t in tables], dtype=np.int32) - 1
+    if (G < 0).any():
+        raise ValueError('the graph is not finished: some edges are missing')
+    return G, np.array([index[v] for v in generators], dtype=np.int32) - 1
+
+# The inverse of each action, Ginv[g][G[g][x]] = x
+def inverses(G):
+    Ginv = np.empty_like(G)
+    rows = np.arange(G.shape[0])[:, None]
+    Ginv[rows, G] = np.arange(G.shape[1])
+    return Ginv
+
+# A spanning forest of the graph by breadth first search from the generators.
+# Each element y other than a generator is y = parent[y] ▷ g if labels[y] = g > 0,
+# or y = parent[y] ▷^-1 g if labels[y] = -g, so following the parents back gives y as
+# a generator acted on by a word. Returns parent, labels and the elements in search order.
+def spanning_tree(G, generators):
+    n = G.shape[1]
+    Ginv = inverses(G)
+    parent = np.full(n, -1, dtype=np.int32)
+    labels = np.zeros(n, dtype=np.int32)
+    seen = np.zeros(n, dtype=bool)
+    order = []
+    queue = deque()
+    for a in generators:
+        if not seen[a]:
+            seen[a] = True
+            order.append(a)
+            queue.append(a)
+    while queue:
+        y = queue.popleft()
+        for g in range(G.shape[0]):
+            for w, table in ((g+1, G), (-g-1, Ginv)):
+                z = table[g, y]
+                if not seen[z]:
+                    seen[z] = True
+                    parent[z] = y
+                    labels[z] = w
+                    order.append(z)
+                    queue.append(z)
+    if len(order) < n:
+        raise ValueError('some elements cannot be reached from the generators')
+    return parent, labels, order
+
+# The word of generators acting on a generator that gives element y, as (generator, word)
+# with signed labels, as in the relations
+def word(y, parent, labels, generators):
+    w = []
+    while parent[y] >= 0:
+        w.append(int(labels[y]))
+        y = parent[y]
+    return list(generators).index(y)+1, w[::-1]
+
+# The operation table T[x, y] = x ▷ y, built one column at a time down the spanning tree.
+# The column of a generator a is its action, and since right multiplication by y ▷ g is
+# R_g^-1 R_y R_g, the column of y ▷ g is G[g][T[Ginv[g], y]] (and the other way round
+# for y ▷^-1 g). Returns T with the parent and labels of the spanning tree.
+def operation_table(G, generators):
+    n = G.shape[1]
+    Ginv = inverses(G)
+    parent, labels, order = spanning_tree(G, generators)
+    T = np.empty((n, n), dtype=np.int32)
+    for i, a in enumerate(generators):
+        T[:, a] = G[i]
+    for y in order:
+        w = labels[y]
+        if w > 0:
+            T[:, y] = G[w-1][T[Ginv[w-1], parent[y]]]
+        elif w < 0:
+            T[:, y] = Ginv[-w-1][T[G[-w-1], parent[y]]]
+    return T, parent, labels
+
+# Each check returns None if the axiom holds, or a counterexample
+
+# x ▷ x = x
+def check_idempotent(T):
+    bad = np.flatnonzero(T[np.arange(len(T)), np.arange(len(T))] != np.arange(len(T)))
+    return (int(bad[0]),) if len(bad) else None
+
+# x -> x ▷ y is a bijection for every y
+def check_right_invertible(T):
+    bad = np.flatnonzero((np.sort(T, axis=0) != np.arange(len(T))[:, None]).any(axis=0))
+    return (int(bad[0]),) if len(bad) else None
+
+# The table agrees with every edge: x ▷ g is G[g][x] for each generator g (its column),
+# and the column of y ▷ g is G[g][T[Ginv[g], y]] for every y.
+# If this holds, the table is the operation of the quandle the graph describes.
+def check_edges(T, G, generators):
+    Ginv = inverses(G)
+    for i, a in enumerate(generators):
+        bad = np.flatnonzero(T[:, a] != G[i])
+        if len(bad):
+            return (int(bad[0]), int(a))
+        bad = np.argwhere(T[:, G[i]] != G[i][T[Ginv[i]]])
+        if len(bad):
+            return (int(bad[0][0]), int(bad[0][1]), i+1)
+    return None
+
+# (x ▷ y) ▷ z = (x ▷ z) ▷ (y ▷ z) for all x, y, z.
+# Every right multiplication is a product of the generators' actions and their inverses,
+# so once check_edges() holds it is enough to check z in the generators, which is n^2
+# work per generator. full checks every z, n^3 work done one z at a time.
+def check_self_distributive(T, generators, full=False):
+    for z in (range(len(T)) if full else generators):
+        column = T[:, z]
+        bad = np.argwhere(column[T] != T[column[:, None], column[None, :]])
+        if len(bad):
+            return (int(bad[0][0]), int(bad[0][1]), int(z))
+    return None
+
+# x ▷^N y = x for all x, y: every right multiplication has order dividing N
+def check_n_quandle(T, N):
+    X = np.broadcast_to(np.arange(len(T))[:, None], T.shape)
+    for _ in range(N):
+        X = np.take_along_axis(T, X, axis=0)
+    bad = np.argwhere(X != np.arange(len(T))[:, None])
+    return (int(bad[0][0]), int(bad[0][1])) if len(bad) else None
+
+# Run every check, N-quandle only if N is given. Returns {name: counterexample or None}
+def verify(T, G, generators, N=None, full=False):
+    result = {
+        'edges': check_edges(T, G, generators),
+        'idempotent': check_idempotent(T),
+        'right invertible': check_right_invertible(T),
+        'self-distributive': check_self_distributive(T, generators, full),
+    }
+    if N is not None:
+        result[f'{N}-quandle'] = check_n_quandle(T, N)
+    return result
+
+# Batched word evaluation.
+# The actions and their inverses are stacked into one table, row 0 the identity, row g the
+# action of g and row gen+g its inverse, so a batch of words padded with 0 is evaluated
+# by one gather per letter position.
+
+def word_table(G):
+    gen, n = G.shape
+    return np.concatenate([np.arange(n, dtype=np.int32)[None, :], G, inverses(G)])
+
+# Words of signed labels as an int array of rows of word_table(), padded with 0 (the identity)
+def encode(words, gen):
+    lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+    letters = np.fromiter(itertools.chain.from_iterable(words), dtype=np.int32, count=lengths.sum())
+    codes = np.zeros((len(words), lengths.max(initial=0)), dtype=np.int32)
+    codes[np.arange(codes.shape[1]) < lengths[:, None]] = np.where(letters > 0, letters, gen - letters)
+    return codes
+
+# The element a ▷ w for each start generator a (1, ..., gen) and word w of signed labels.
+# words can also be codes from encode(), to evaluate the same batch several times.
+def evaluate(G, generators, starts, words, table=None):
+    if table is None:
+        table = word_table(G)
+    codes = words if isinstance(words, np.ndarray) else encode(words, G.shape[0])
+    x = np.asarray(generators)[np.asarray(starts) - 1]
+    for j in range(codes.shape[1]):
+        x = table[codes[:, j], x]
+    return x
+
+# Whether a ▷ w = b holds for each relation [a, *w, b], written like the initial relations
+def holds(G, generators, relations):
+    starts = [rel[0] for rel in relations]
+    ends = np.asarray(generators)[[rel[-1]-1 for rel in relations]]
+    return evaluate(G, generators, starts, [rel[1:-1] for rel in relations]) == ends
+
+# Whether a ▷ u = b ▷ v for each pair of (start generator, word) pairs ((a, u), (b, v))
+def equal(G, generators, pairs):
+    table = word_table(G)
+    left = evaluate(G, generators, [a for (a, _), _ in pairs], [u for (_, u), _ in pairs], table)
+    right = evaluate(G, generators, [b for _, (b, _) in pairs], [v for _, (_, v) in pairs], table)
+    return left == right
@@ -0,0 +1,76 @@
+# Enumerate a batch of presentations read from a JSONL file (or stdin), one job per line:
+#   {"label": "try 1", "gen": 3, "init": [[3,2,1,2,1,3,2], ...], "sec": [[1,1], ...]}
+# sec is optional and built with secondary_relations() when missing, as q_graph does,
+# and a job can give "k" instead of "init" for the 111 family.
+# The jobs run in parallel with run_jobs(), and one result line is written as each job
+# finishes, in completion order. Jobs are only read as workers free up, so memory use does
+# not grow with the size of the file. Finished graphs go to the cache; the "key" field of a
+# result is the cache key, for cache_load().
+#
+#   python batch.py jobs.jsonl > results.jsonl
+#   cat jobs.jsonl | python batch.py - --processes 4 --timeout 600
+
+import sys
+import json
+import argparse
+import itertools
+import cayley
+
+# The (gen, init, sec) of a job line, with sec filled in
+def parse(line):
+    job = json.loads(line)
+    gen = job['gen']
+    init = job['init'] if 'init' in job else cayley.presentation(gen, job['k'])
+    sec = job.get('sec')
+    if sec is None:
+        sec = cayley.secondary_relations(gen, init)
+    return job.get('label'), gen, init, sec
+
+# Run the jobs in lines and yield one result record per job, in completion order.
+# Lines that are not valid jobs give an error record straight away.
+def run_batch(lines, processes=None, timeout=None, memory=None, cache=True, **options):
+    running = {} # number of the job in run_jobs(): its record, until the job finishes
+    numbers = itertools.count() # run_jobs() numbers the jobs in the order they are read
+    errors = []
+
+    def jobs():
+        for n, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                label, gen, init, sec = parse(line)
+            except (ValueError, KeyError, TypeError) as e:
+                errors.append({'line': n, 'status': f'error: invalid job: {e}'})
+                continue
+            running[next(numbers)] = {'line': n, 'label': label, 'gen': gen,
+                                      'key': cayley.cache_key(gen, init, sec)}
+            yield gen, init, sec
+
+    for n, result in cayley.run_jobs(jobs(), processes, timeout, memory, cache, **options):
+        yield from errors
+        errors.clear()
+        yield dict(running.pop(n), **result)
+    yield from errors
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Enumerate the presentations in a JSONL file, one result line per job')
+    parser.add_argument('jobs', nargs='?', default='-', help='JSONL file of jobs, - for stdin')
+    parser.add_argument('--output', help='append the results to this file instead of printing them')
+    parser.add_argument('--processes', type=int, help='worker processes, one per CPU by default')
+    parser.add_argument('--timeout', type=float, help='seconds allowed per job')
+    parser.add_argument('--memory', type=int, help='bytes of memory allowed per job')
+    parser.add_argument('--strategy', default='hlt', choices=['hlt', 'felsch'])
+    parser.add_argument('--lookahead', type=int)
+    parser.add_argument('--max-vertices', type=int, help='stop a job with more live vertices than this')
+    parser.add_argument('--patience', type=int, default=10,
+                        help='samples of steady growth before a job is stopped as suspected infinite, 0 to never stop')
+    parser.add_argument('--no-cache', action='store_true', help='neither read nor write the cache')
+    args = parser.parse_args()
+
+    lines = sys.stdin if args.jobs == '-' else open(args.jobs)
+    out = sys.stdout if args.output is None else open(args.output, 'a')
+    for record in run_batch(lines, args.processes, args.timeout, args.memory, not args.no_cache,
+                            strategy=args.strategy, lookahead=args.lookahead, progress=None,
+                            budget=cayley.Budget(args.max_vertices, patience=args.patience or None)):
+        out.write(json.dumps(record) + '\n')
+        out.flush()
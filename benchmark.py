@@ -0,0 +1,129 @@
+# Benchmarks for the enumeration engine in cayley.py
+# Every presentation already in the repo is enumerated in its own process, one at a time,
+# recording runtime, peak vertices, RSS growth and final size. The RSS growth is how far the
+# job's peak RSS rose above what its process started with, the memory the enumeration used. The sizes are checked against
+# the known element counts, and everything else is compared with the stored baseline.
+#
+#   python benchmark.py                 run and compare with benchmark_baseline.json
+#   python benchmark.py --update        run and store the results as the new baseline
+#   python benchmark.py --only try      only run the presentations with 'try' in their name
+
+import os
+import sys
+import json
+import argparse
+from tabulate import tabulate
+import cayley
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, 'benchmark_baseline.json')
+
+
+# name: (gen, init, sec, number of elements)
+# sec is None when it is built from init by secondary_relations(), as q_graph does
+PRESENTATIONS = {
+    # Old/NQCayleyGraph.py and Old/test.py
+    '134 elements': (3, [[1,-3,1,3,2,1,2,1,2,1,2],[1,3,1,-3,1,2,1,2,1,2,1,2],[3,2,1,3]],
+                     [[1, 1], [2, 2], [3, 3, 3], [2,1,3,1,2,-3],[-3,1,3,1,-3,1,3,2,1,2,1,2,1,2,1,2,1,2,1,2],
+                      [1,3,1,-3,1,3,1,-3,1,-3,1,3,1,-3,1,3]], 134),
+    # commented as 52 elements, but legacy_graph() gives 36 for it as well
+    'k=2 1,1,2': (3, [[1, 2, 1, 2, 1, 2, 1, 3, 1, 2, 1, 2], [1, 2, 1, 3, 2, 1, 3], [3, 1, 2, 1, 2, 1, 3, 1, 2, 1, 2, 1, 2]],
+                  [[1, 1], [2, 2], [3, 3],
+                   [1, 2, 1, 3, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 1, 3, 1, 2, 1, 2],
+                   [1, 2, 3, 1, 2, 1, 2, 1, 3, 2, 1, 3],
+                   [1, 2, 1, 2, 1, 3, 1, 2, 1, 2, 1, 3, 1, 2, 1, 2, 1, 3, 1, 2, 1, 2, 1, 2]], 36),
+    'old k=3': (3, [[3,2,1,2,1,2,1,2,1,3,1,2,1], [1,2,3,2,1,2,1,2], [3,1,2,1,2,1,3,2]],
+                [[1, 1], [2, 2], [3, 3],
+                 [2,1,3,1,2,1,2,1,2,1,2,3,2,1,2,1,2,1,2,1,3,1,2,1],
+                 [1,2,1,2,3,2,1,2,3,2,1,2,1,2],
+                 [3,1,2,1,2,1,3,1,2,1,2,1,3,2]], 108),
+    'k=2 1,1,1 (test.py)': (3, [[3,1,2,1,3,1,2,1,2,1],[1,2,1,2,1,2,1,3,1,2,1,2],[3,1,2,1,2,3,1,2]], None, 60),
+    # the k = -2 variants
+    'try 1': (3, [[3,2,1,2,1,3,2],[3,2,3,2,1,2,1],[2,1,2,3,2,1,2,1,2,1]], None, 60),
+    'try 2': (3, [[3,2,3,2,1,2,1],[1,2,1,2,1,2,3,2,1,2],[3,2,1,2,1,3,2]], None, 60),
+    'try 3': (3, [[1,2,1,2,1,2,1,3,1,2,1,2],[3,1,2,1,2,3,1,2],[3,1,2,1,3,1,2,1,2,1]], None, 60),
+    'k=-2 1,1,1': (3, [[1,2,1,2,1,3,1,2,1,3],[2,1,2,1,3,1,2,1,2,1,2,1],[2,1,3,2,1,2,1,3]], None, 60),
+    'k=-1 1,1,1': (3, [[1,2,1,2,1,3,1,2,1,3],[2,2,1,2,1,2,1,2,1,2,1,3,1,2,1,2,1,2,1],[2,1,3,2,1,2,1,2,1,2,1,2,1,3]], None, 132),
+    'k=0 1,1,1': (3, [[1,2,1,2,1,3,1,2,1,3],[2,1,2,3,1],[2,1,3,1,2,1,2,1,2,1,2,3]], None, 84),
+    'k=2 1,1,1': (3, [[1,2,1,2,1,3,1,2,1,3], [2,1,2,1,2,1,2,1,2,3,2,1,2,1,2,1,1],
+                      [2,1,3,1,2,1,2,1,2,1,2,1,2,1,2,1,2,1,2,1,2,1,2,3]], None, 228),
+    # the 4 generator cases
+    'k=-2 1,1,1 4 gens': (4, [[1,4,1,3,1,4], [3,2,3,2,1,2,1], [3,1,4,1,2,3,2],[2,1,2,1,4]], None, 60),
+    'k=-1 1,1,1 4 gens': (4, [[4,1,3,1], [3,2,3,2,1,2,1], [3,1,2,3,2],[2,1,2,1,4]], None, 12),
+}
+# the k-family of 111GrapherNew.py, as in graphs/
+for k, size in zip(range(-4, 4), [204, 132, 60, 12, 84, 156, 228, 300]):
+    PRESENTATIONS[f'111 k={k}'] = (3, cayley.presentation(3, k), None, size)
+# big enough for its memory use to show in the RSS growth
+PRESENTATIONS['111 k=27'] = (3, cayley.presentation(3, 27), None, 2028)
+
+# Enumerate each presentation repeat times, one process at a time, keeping the fastest run
+def run(names, repeat=1, timeout=600, **options):
+    results = {}
+    for name in names:
+        gen, init, sec, _ = PRESENTATIONS[name]
+        runs = [r for _, r in cayley.run_jobs([(gen, init, sec)]*repeat, processes=1, timeout=timeout,
+                                               cache=False, progress=None, **options)]
+        results[name] = min(runs, key=lambda r: r['runtime'])
+    return results
+
+# Compare the results with the known sizes and the baseline.
+# Returns the table rows and whether anything failed: a wrong size, a failed run, or a
+# runtime, peak or RSS more than tolerance above the baseline.
+def compare(results, baseline, tolerance=0.25):
+    rows = []
+    failed = False
+    for name, r in results.items():
+        expected = PRESENTATIONS[name][3]
+        base = baseline.get(name, {})
+        notes = []
+        if r['status'] != 'ok':
+            notes.append(r['status'])
+        elif r['size'] != expected:
+            notes.append(f'expected {expected}')
+        if base and r['status'] == 'ok':
+            # ignore differences below the timer noise
+            if r['runtime'] > base['runtime'] * (1+tolerance) and r['runtime'] - base['runtime'] > 0.05:
+                notes.append('slower')
+            if r['peak'] > base['peak'] * (1+tolerance):
+                notes.append('higher peak')
+            # and below a megabyte, which the small presentations never reach
+            if r['rss_growth'] > base['rss_growth'] * (1+tolerance) and r['rss_growth'] - base['rss_growth'] > 2**20:
+                notes.append('more memory')
+        failed = failed or bool(notes)
+        speedup = round(base['runtime'] / r['runtime'], 2) if base and r.get('size') else None
+        rows.append([name, r.get('size'), expected, round(r['runtime'], 3), base.get('runtime'), speedup,
+                     r.get('peak'), base.get('peak'), round(r['rss_growth'] / 2**20, 1) if 'rss_growth' in r else None,
+                     ', '.join(notes) or 'ok'])
+    return rows, failed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the enumeration engine on the presentations in the repo')
+    parser.add_argument('--only', help='only run presentations whose name contains this')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per presentation, the fastest is kept')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds allowed per run')
+    parser.add_argument('--strategy', default='hlt', choices=['hlt', 'felsch'])
+    parser.add_argument('--lookahead', type=int)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args()
+
+    names = [name for name in PRESENTATIONS if args.only is None or args.only in name]
+    results = run(names, args.repeat, args.timeout, strategy=args.strategy, lookahead=args.lookahead)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    rows, failed = compare(results, {} if args.update else baseline, args.tolerance)
+    print(tabulate(rows, headers=['presentation', 'size', 'expected', 'runtime (s)', 'baseline (s)', 'speedup',
+                                  'peak', 'baseline peak', 'RSS growth (MB)', 'status']))
+
+    if args.update:
+        baseline.update({name: {'size': r['size'], 'runtime': round(r['runtime'], 4), 'peak': r['peak'], 'rss_growth': r['rss_growth']}
+                         for name, r in results.items() if r['status'] == 'ok'})
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1)
+        print('baseline written to', args.baseline)
+    sys.exit(1 if failed else 0)
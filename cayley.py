@@ -0,0 +1,1342 @@
+# Enumeration engine for Cayley graphs of N-quandles, used by 111GrapherNew.py.
+# Only the standard library is imported here, so worker processes start fast;
+# tabulate is only loaded to print tables.
+
+import time
+import os
+import sys
+import json
+import pickle
+import struct
+import hashlib
+import multiprocessing
+from multiprocessing.connection import wait
+from array import array
+
+ENGINE_VERSION = 2 # part of the cache key, bump it whenever the results of the engine change
+GRAPH_MAGIC = b'QGRAPH1\n'
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+CACHE_LIMIT = 2**30 # bytes
+STEP_INTERVAL = 0.1 # seconds between two monitor steps inside a Felsch deduction cascade
+
+# Collapse the set of edges
+def collapse(Edges, Vertices):
+    done = False
+    while not done: # repeat loop as long as a change was made
+        done = True
+        replace = {} # dictionary of vertex replacements, old:new
+        for i in range(len(Edges)):
+            for j in range(i+1,len(Edges)):
+                if Edges[i][2] == Edges[j][2]: # if two edges have the same label
+                    # if they start at the same vertex, merge the endpoints
+                    if Edges[i][0] == Edges[j][0]:
+                        if Edges[i][1] != Edges[j][1]:
+                            # replace larger vertex with smaller
+                            replace[max(Edges[i][1],Edges[j][1])] = min(Edges[i][1],Edges[j][1])
+                            done = False
+                    # if they end at the same vertex, merge the starting points
+                    elif Edges[i][1] == Edges[j][1]:
+                        replace[max(Edges[i][0],Edges[j][0])] = min(Edges[i][0],Edges[j][0])
+                        done = False
+        if not done:
+            # Go through the edges and replace vertices
+            # Keep replacing, in case there is a chain (replace a with b, and b with c)
+            for e in range(len(Edges)):
+                while Edges[e][0] in replace:
+                    Edges[e] = (replace[Edges[e][0]], Edges[e][1], Edges[e][2])
+                while Edges[e][1] in replace:
+                    Edges[e] = (Edges[e][0], replace[Edges[e][1]], Edges[e][2])
+        Edges = list(set(Edges)) # remove duplicates
+        for v in replace:
+            Vertices.remove(v) # remove vertices that were collapsed
+            
+    return Vertices, Edges
+
+# Add secondary relations at a vertex, then collapse redundant edges.
+def add_relations(vertex, relations, Vertices, Edges):
+    for rel in relations:
+        v1 = vertex
+        v2 = max(Vertices) + 1 # new vertex
+        for w in rel[:len(rel)-1]:
+            if w > 0:  # add all edges with positive labels
+                Edges.append((v1, v2, w))
+            else:
+                Edges.append((v2, v1, -w))
+            Vertices.add(v2) # add new vertex to list of vertices
+            v1 = v2
+            v2 = v2 + 1
+        # final edge returns to original vertex
+        if rel[len(rel)-1] > 0:  # add all edges with positive labels
+            Edges.append((v1, vertex, rel[len(rel)-1]))
+        else:
+            Edges.append((vertex, v1, -rel[len(rel)-1]))
+        Vertices, Edges = collapse(Edges, Vertices)
+        
+    return Vertices, Edges
+
+# Union-find coincidence engine.
+# The action of each generator is stored as a forward table (start -> end) and an
+# inverse table (end -> start), indexed by vertex, with -1 where no edge is defined yet.
+# A clash (two edges with the same label leaving or entering the same vertex) is found
+# as soon as the edge causing it is added, rather than by comparing every pair of edges.
+# Merges keep the smaller vertex, exactly like collapse().
+class CayleyGraph:
+    def __init__(self, gen):
+        self.gen = gen
+        self.forward = [array('i', [-1]) for _ in range(gen)] # forward[g-1][start] = end
+        self.backward = [array('i', [-1]) for _ in range(gen)] # backward[g-1][end] = start
+        self.parent = array('i', [-1]) # union-find: v if v is live, -1 if unused, else the vertex v was merged into
+        self.size = 0 # number of live vertices
+        self.position = 1 # every live vertex below this one is complete
+        self.completed = 0 # number of live vertices below position
+        self.pending = [] # pairs of vertices that still have to be merged
+        self.peak = 0 # largest number of live vertices so far
+        self.deductions = None # if a list, every edge added is recorded in it as (start, label)
+        self.generators = list(range(1, gen+1)) # vertex of each generator (up to merges)
+        self.status = 'finished' # or why the enumeration was stopped early, see Budget
+        self.edge_count = 0
+        self.coincidences = 0 # number of merges so far
+        self.created = 0 # number of vertices ever added
+        self.collapses = 0 # number of collapse() calls that had something to merge
+        self.profile = None # a Profile, if the enumeration is being profiled
+        self.cached = False # True if the graph was loaded from the cache rather than enumerated
+        self.prepared = None # what prepare_relators() saved, if it was used
+
+    # Add a vertex with a new id, larger than every id used so far
+    def new_vertex(self):
+        v = len(self.parent)
+        self.add_vertex(v)
+        return v
+
+    def add_vertex(self, v):
+        while len(self.parent) <= v:
+            self.parent.append(-1)
+            for g in range(self.gen):
+                self.forward[g].append(-1)
+                self.backward[g].append(-1)
+        self.parent[v] = v
+        self.size += 1
+        self.created += 1
+        self.peak = max(self.peak, self.size)
+
+    def find(self, v):
+        parent = self.parent
+        root = v
+        while parent[root] != root:
+            root = parent[root]
+        while parent[v] != root: # path compression
+            parent[v], v = root, parent[v]
+        return root
+
+    # Add the edge start -> end with a positive label.
+    # If it clashes with an edge already there, record the pair to merge instead.
+    def add_edge(self, start, end, label):
+        start = self.find(start)
+        end = self.find(end)
+        forward = self.forward[label-1]
+        backward = self.backward[label-1]
+        clash = False
+        old = forward[start]
+        if old >= 0 and old != end:
+            self.pending.append((old, end))
+            clash = True
+        old = backward[end]
+        if old >= 0 and old != start:
+            self.pending.append((old, start))
+            clash = True
+        if not clash:
+            forward[start] = end
+            backward[end] = start
+            self.edge_count += 1
+            if self.deductions is not None:
+                self.deductions.append((start, label))
+
+    # Merge all pending pairs, and every pair those merges force
+    def collapse(self):
+        if not self.pending:
+            return
+        profile = self.profile
+        if profile is not None:
+            before = profile.snapshot(self)
+        self.collapses += 1
+        parent = self.parent
+        while self.pending:
+            a, b = self.pending.pop()
+            a = self.find(a)
+            b = self.find(b)
+            if a == b:
+                continue
+            keep, lose = min(a, b), max(a, b)
+            parent[lose] = keep
+            self.size -= 1
+            self.coincidences += 1
+            if lose < self.position:
+                self.completed -= 1
+            # move the edges of the merged vertex onto the one that is kept
+            for g in range(self.gen):
+                forward = self.forward[g]
+                backward = self.backward[g]
+                end = forward[lose]
+                if end >= 0:
+                    forward[lose] = -1
+                    backward[end] = -1
+                    self.edge_count -= 1
+                    self.add_edge(keep, end, g+1)
+                start = backward[lose]
+                if start >= 0:
+                    backward[lose] = -1
+                    forward[start] = -1
+                    self.edge_count -= 1
+                    self.add_edge(start, keep, g+1)
+        if profile is not None:
+            profile.phase('collapse', self, before)
+
+    # Trace a secondary relation at a vertex along a path of new vertices, then collapse
+    def add_relation(self, vertex, rel):
+        v1 = vertex
+        for w in rel[:len(rel)-1]:
+            v2 = self.new_vertex()
+            if w > 0:
+                self.add_edge(v1, v2, w)
+            else:
+                self.add_edge(v2, v1, -w)
+            v1 = v2
+        # final edge returns to original vertex
+        w = rel[len(rel)-1]
+        if w > 0:
+            self.add_edge(v1, vertex, w)
+        else:
+            self.add_edge(vertex, v1, -w)
+        self.collapse()
+
+    # The smallest incomplete vertex, or None if every vertex is complete.
+    # Merges keep the smaller vertex and new vertices get larger ids than all others, so
+    # nothing below it can become incomplete again and it only ever moves forwards,
+    # skipping merged vertices as it goes.
+    def next_incomplete(self):
+        parent = self.parent
+        while self.position < len(parent) and parent[self.position] != self.position:
+            self.position += 1
+        if self.position == len(parent):
+            return None
+        return self.position
+
+    # Mark the smallest incomplete vertex as complete
+    def complete(self, v):
+        if self.parent[v] == v:
+            self.completed += 1
+        self.position = v+1
+
+    # True once more than half of the ids in use belong to merged vertices
+    def sparse(self):
+        return len(self.parent) > 2*self.size + 64
+
+    # Renumber the live vertices as 1, 2, ..., size, keeping their order.
+    # The tables, the union-find, the generators and the scheduling position are all
+    # rewritten, so memory follows the live vertex count rather than the number of
+    # vertices ever created. Only call this when there is nothing left to collapse.
+    def compact(self):
+        if self.profile is not None:
+            before = self.profile.snapshot(self)
+        renumber = self.renumbering()
+        position = self.next_incomplete()
+        self.generators = self.dense_generators(renumber)
+        self.forward = [renumber_table(t, renumber, self.size) for t in self.forward]
+        self.backward = [renumber_table(t, renumber, self.size) for t in self.backward]
+        self.parent = array('i', range(self.size+1))
+        self.parent[0] = -1
+        self.position = self.size+1 if position is None else renumber[position]
+        if self.profile is not None:
+            self.profile.phase('rewrite', self, before)
+
+    # The new id of each live vertex (old id -> new id) if they were renumbered 1, 2, ..., size
+    def renumbering(self):
+        parent = self.parent
+        renumber = array('i', [-1]) * len(parent)
+        n = 0
+        for v in range(1, len(parent)):
+            if parent[v] == v:
+                n = n+1
+                renumber[v] = n
+        return renumber
+
+    def dense_generators(self, renumber):
+        return [renumber[self.find(v)] for v in self.generators]
+
+    # The forward tables and the vertex of each generator with the live vertices renumbered
+    # 1, ..., size in order, as write_graph() stores them; the graph itself is not changed
+    def dense_tables(self):
+        self.collapse()
+        renumber = self.renumbering()
+        return [renumber_table(t, renumber, self.size) for t in self.forward], self.dense_generators(renumber)
+
+    # A finished graph, built from its forward tables as written by write_graph()
+    @classmethod
+    def from_tables(cls, forward, generators):
+        n = len(forward[0]) - 1
+        graph = cls(len(forward))
+        graph.forward = forward
+        graph.backward = []
+        for table in forward:
+            inverse = array('i', [-1]) * (n+1)
+            for v in range(1, n+1):
+                if table[v] >= 0:
+                    inverse[table[v]] = v
+            graph.backward.append(inverse)
+        graph.parent = array('i', range(n+1))
+        graph.parent[0] = -1
+        graph.size = graph.peak = graph.completed = n
+        graph.edge_count = sum(1 for table in forward for v in table if v >= 0)
+        graph.position = n+1
+        graph.generators = list(generators)
+        return graph
+
+    # The end of the edge with signed label w at v (inverse action if w < 0), or -1
+    def image(self, v, w):
+        if w > 0:
+            return self.forward[w-1][v]
+        return self.backward[-w-1][v]
+
+    # Add the edge v -> u with signed label w
+    def join(self, v, u, w):
+        if w > 0:
+            self.add_edge(v, u, w)
+        else:
+            self.add_edge(u, v, -w)
+
+    # Trace a secondary relation at a vertex, following the edges that already exist
+    # forwards from the start and backwards from the end of the relation.
+    # New vertices are only added for the gap in between; a gap of a single edge is a
+    # deduction and is added directly, and if the two ends meet they are merged.
+    # If define is False, a gap longer than one edge is left alone.
+    def scan_relation(self, vertex, rel, define=True):
+        self.collapse()
+        vertex = self.find(vertex)
+        n = len(rel)
+        # scan forwards
+        f = vertex
+        i = 0
+        while i < n:
+            v = self.image(f, rel[i])
+            if v < 0:
+                break
+            f = v
+            i = i+1
+        if i == n:
+            if f != vertex:
+                self.pending.append((f, vertex))
+                self.collapse()
+            return
+        # scan backwards
+        b = vertex
+        j = n-1
+        while j > i:
+            v = self.image(b, -rel[j])
+            if v < 0:
+                break
+            b = v
+            j = j-1
+        if j > i and not define:
+            return
+        # fill the gap rel[i..j] between f and b
+        for w in rel[i:j]:
+            v = self.new_vertex()
+            self.join(f, v, w)
+            f = v
+        self.join(f, b, rel[j])
+        self.collapse()
+
+    # Export the set of live vertices
+    def vertices(self):
+        parent = self.parent
+        return {v for v in range(len(parent)) if parent[v] == v}
+
+    # Export the edges as a list of triples (start, end, label)
+    def edges(self):
+        return [(start, end, g+1) for g in range(self.gen)
+                for start, end in enumerate(self.forward[g]) if end >= 0]
+
+    # The forward and inverse tables as int32 NumPy arrays sharing memory with the graph.
+    # While the arrays are alive the graph cannot grow, so only use this on a finished graph.
+    def as_numpy(self):
+        import numpy as np
+        return ([np.frombuffer(t, dtype=np.int32) for t in self.forward],
+                [np.frombuffer(t, dtype=np.int32) for t in self.backward])
+
+# Rewrite a table with the renumbering old id -> new id from CayleyGraph.renumbering()
+def renumber_table(table, renumber, size):
+    new = array('i', [-1]) * (size+1)
+    for v in range(1, len(table)):
+        if table[v] >= 0:
+            new[renumber[v]] = renumber[table[v]]
+    return new
+
+# The forward tables of the output of q_graph, (Vertices, Edges), with the vertices numbered
+# 1, ..., n in order, -1 where an edge is missing. Returns the tables and {vertex: new id}.
+def edge_tables(Vertices, Edges, gen):
+    index = {v: i for i, v in enumerate(sorted(Vertices), 1)}
+    tables = [array('i', [-1]) * (len(index)+1) for _ in range(gen)]
+    for start, end, label in Edges:
+        tables[label-1][index[start]] = index[end]
+    return tables, index
+
+# Build the initial relations for the 111 family
+def presentation(gen, k):
+    init = [[1,2,1,2,3,2,3]]
+
+    threek4 = int(3*k+4)
+    threek4list = [2,1]
+    if threek4 < 0:
+        threek4list = [1,2]
+        threek4 = abs(threek4)
+
+    init.append([2,3,*[v for _ in range(threek4) for v in threek4list],3])
+
+    if k % 2 == 0:
+        threek2 = int((3*k+2)/2)
+        threek2list = [1,2]
+        threek = int(3*k/2)
+        threeklist = [1,2]
+
+        if threek2 < 0:
+            threek2list = [2,1]
+            threek2 = abs(threek2)
+        
+        if threek < 0:
+            threeklist = [2,1]
+            threek = abs(threek)
+
+        init.append([2,*[v for _ in range(threek2) for v in threek2list],1,3,*[v for _ in range(threek) for v in threeklist],1])
+    else:
+        threek1 = int((3*k-1)/2)
+        threek1list = [1,2]
+        threek3 = int((3*k+3)/2)
+        threek3list = [1,2]
+
+        if threek1 < 0:
+            threek1list = [2,1]
+            threek1 = abs(threek1)
+
+        if threek3 < 0:
+            threek3list = [2,1]
+            threek3 = abs(threek3)
+
+        init.append([2,*[v for _ in range(threek1) for v in threek1list],1,3,*[v for _ in range(threek3) for v in threek3list],1])
+
+    return init
+
+# Build the secondary relations from the initial relations
+def secondary_relations(gen, init):
+    sec = []
+
+    for i in range(gen):
+        sec.append([i+1, i+1])
+
+    for i in init[0:-1]:
+        start = i[0]
+        end = i[-1]
+        exp = i[1:-1]
+        build = []
+        build.extend(exp[::-1])
+        build.append(start)
+        build.extend(exp)
+        build.append(end)
+        sec.append(build)
+
+    return sec
+
+# Cancel each letter that is followed by its inverse, w -w or -w w, until none is
+def free_reduce(word):
+    reduced = []
+    for w in word:
+        if reduced and reduced[-1] == -w:
+            reduced.pop()
+        else:
+            reduced.append(w)
+    return reduced
+
+# A secondary relation holds at every vertex, so it can be cyclically reduced and replaced by
+# any rotation of itself or of its inverse without changing the graph. The canonical form is
+# the freely and cyclically reduced word, rotated to the smallest of all these rotations with
+# the labels ordered 1, -1, 2, -2, ... (on the repo's presentations this order gives HLT the
+# lowest peaks, a third to a half below the words as written for the 111 family).
+def canonical_relator(rel):
+    word = free_reduce(rel)
+    start, end = 0, len(word)
+    while end - start > 1 and word[start] == -word[end-1]:
+        start, end = start+1, end-1
+    word = word[start:end]
+    return min((w[i:] + w[:i] for w in (word, [-w for w in reversed(word)]) for i in range(len(word))),
+               key=lambda rot: [(abs(w), w < 0) for w in rot], default=[])
+
+# Preprocess the secondary relations: canonical forms, without the empty words and the
+# duplicates, shortest first (every vertex scans every relation, so HLT finds the short ones'
+# coincidences before it defines vertices for the long ones).
+# Returns the relations and {'relators': (before, after), 'letters': (before, after)}; the
+# letters are what a scan of every relation at one vertex costs.
+def prepare_relators(sec):
+    relators = sorted({tuple(canonical_relator(rel)) for rel in sec} - {()}, key=lambda rel: (len(rel), rel))
+    relators = [list(rel) for rel in relators]
+    return relators, {'relators': (len(sec), len(relators)),
+                      'letters': (sum(map(len, sec)), sum(map(len, relators)))}
+
+# Reference implementation with the pairwise collapse(), kept to check the engine against
+def legacy_graph(gen, init, sec):
+    Vertices = set({}) # set of vertices.  Vertices are represented as positive integers.
+    Edges = [] # list of edges. Each edge is a tuple (start, end, label)
+
+    for g in range(1,gen+1):
+        Edges.append((g, g, g))
+        Vertices.add(g)
+
+    for rel in init:
+        v1 = rel[0]
+        v2 = max(Vertices)+1 # new vertex
+        for w in rel[1:len(rel)-2]:
+            if w > 0: # add all edges with positive labels
+                Edges.append((v1, v2, w))
+            else:
+                Edges.append((v2, v1, -w))
+            Vertices.add(v2)
+            v1 = v2
+            v2 = v2+1
+        w = rel[len(rel)-2]
+        v2 = rel[len(rel)-1]
+        if w > 0:  # add all edges with positive labels
+            Edges.append((v1, v2, w))
+        else:
+            Edges.append((v2, v1, -w))
+
+    completed = set({})
+    while completed != Vertices:
+        next_vertex = min(Vertices-completed)
+        Vertices, Edges = add_relations(next_vertex, sec, Vertices, Edges)
+        completed.add(next_vertex)
+        completed.intersection_update(Vertices) # remove completed vertices that were collapsed
+
+    return Vertices, Edges
+
+# Every cyclic rotation of a secondary relation holds at every vertex.
+# Index the rotations by their first label, for processing deductions,
+# as pairs (rotation, the relation it came from).
+# The rotations of the inverse word are left out: they trace the same cycles the other way,
+# and scan_relation() already scans both ways.
+def rotations(sec):
+    table = {}
+    seen = set()
+    for rel in sec:
+        for i in range(len(rel)):
+            rot = rel[i:] + rel[:i]
+            if tuple(rot) not in seen:
+                seen.add(tuple(rot))
+                table.setdefault(rot[0], []).append((rot, rel))
+    return table
+
+# Lookahead: scan every vertex against every secondary relation without adding new
+# vertices, and collapse whatever coincidences that turns up.
+# Returns the threshold for the next pass, doubled if this pass left more than half of it alive.
+# Each pass is reported to the monitor as a 'lookahead' event.
+def look_ahead(graph, sec, threshold, monitor):
+    if graph.profile is not None:
+        snapshot = graph.profile.snapshot(graph)
+    before = graph.size
+    for v in range(1, len(graph.parent)):
+        for rel in sec:
+            if graph.parent[v] != v:
+                break
+            graph.scan_relation(v, rel, define=False)
+    monitor.event(graph, 'lookahead', before=before)
+    if graph.profile is not None:
+        graph.profile.phase('lookahead', graph, snapshot)
+    if graph.size > threshold // 2:
+        threshold = 2*threshold
+    return threshold
+
+# Periodic checkpoints of an enumeration, to a file that cayley_graph(..., resume=True) continues from.
+# A checkpoint holds the whole graph (tables, union-find, scheduling position, id counter)
+# and the lookahead threshold, and is only taken between two steps, when nothing is pending.
+class Checkpoints:
+    def __init__(self, path, key, strategy, interval):
+        self.path = path
+        self.key = key # cache_key() of the presentation, so a checkpoint is never resumed for another one
+        self.strategy = strategy
+        self.interval = interval # seconds
+        self.last = time.time()
+
+    def save(self, graph, lookahead):
+        state = {'key': self.key, 'strategy': self.strategy, 'lookahead': lookahead, 'graph': vars(graph)}
+        temp = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, self.path) # the previous checkpoint stays valid until this one is complete
+        self.last = time.time()
+
+    def tick(self, graph, lookahead):
+        if time.time() - self.last >= self.interval:
+            self.save(graph, lookahead)
+
+    # The graph and lookahead threshold of the latest checkpoint, or None if there is none
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        if state['key'] != self.key or state['strategy'] != self.strategy:
+            raise ValueError(f'{self.path} is a checkpoint of another presentation or strategy')
+        graph = CayleyGraph(state['graph']['gen'])
+        vars(graph).update(state['graph'])
+        return graph, state['lookahead']
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+# Resource budgets for an enumeration, and a monitor for quandles that look infinite.
+# check() is called between steps and returns None, or the reason the run should stop.
+# Every window completed vertices the live/completed ratio is sampled; if over the last
+# patience samples the live count kept growing while the ratio settled (changing by less
+# than tolerance each time), the run is growing at a steady rate and is "suspected infinite".
+# patience=None turns this off.
+class Budget:
+    def __init__(self, max_vertices=None, max_time=None, max_rss=None, window=1000, patience=10, tolerance=0.01):
+        self.max_vertices = max_vertices
+        self.max_time = max_time # seconds
+        self.max_rss = max_rss # bytes of resident memory, see memory()
+        self.window = window
+        self.patience = patience
+        self.tolerance = tolerance
+        self.reset()
+
+    # Start measuring a new run
+    def reset(self):
+        self.start = time.time()
+        self.start_peak = rss()
+        self.samples = [] # (live, completed)
+        self.next_sample = self.window
+
+    def check(self, graph):
+        if self.max_vertices is not None and graph.size > self.max_vertices:
+            return 'too many vertices'
+        if self.max_time is not None and time.time() - self.start > self.max_time:
+            return 'out of time'
+        if self.max_rss is not None and self.memory() > self.max_rss:
+            return 'out of memory'
+        if self.patience is not None and graph.completed >= self.next_sample:
+            self.next_sample = graph.completed + self.window
+            self.samples.append((graph.size, graph.completed))
+            recent = self.samples[-self.patience-1:]
+            if len(recent) > self.patience and all(
+                    live2 > live1 and abs(live2/completed2 - live1/completed1) <= self.tolerance*live1/completed1
+                    for (live1, completed1), (live2, completed2) in zip(recent, recent[1:])):
+                return 'suspected infinite'
+        return None
+
+    # The resident memory of the process now. Without /proc, the peak RSS once this run has
+    # raised it; until then the peak belongs to an earlier run (or the parent of a forked
+    # worker) and says nothing about this one.
+    def memory(self):
+        now = current_rss()
+        if now is not None:
+            return now
+        peak = rss()
+        return peak if peak > self.start_peak else 0
+
+# Resident memory of this process now in bytes, or None where /proc/self/statm is missing (macOS)
+def current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+# Peak resident memory of this process in bytes (ru_maxrss is in kilobytes on Linux, bytes on macOS)
+def rss():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+# Where the time goes in an enumeration, per phase and per secondary relation.
+# Each entry adds up seconds, vertices created, coincidences, collapse passes and calls.
+# Collapsing is also counted in the phase or relation that caused it.
+class Profile:
+    FIELDS = ('seconds', 'vertices', 'coincidences', 'collapses', 'calls')
+
+    def __init__(self):
+        self.phases = {} # name: totals
+        self.relators = {} # tuple(rel): totals
+        self.names = {} # tuple(rel): the relation to report it as, for relations that were preprocessed
+
+    def snapshot(self, graph):
+        return (time.perf_counter(), graph.created, graph.coincidences, graph.collapses)
+
+    def add(self, table, key, graph, before):
+        now = self.snapshot(graph)
+        totals = table.setdefault(key, [0, 0, 0, 0, 0])
+        for i in range(4):
+            totals[i] += now[i] - before[i]
+        totals[4] += 1
+
+    def phase(self, name, graph, before):
+        self.add(self.phases, name, graph, before)
+
+    def relator(self, rel, graph, before):
+        self.add(self.relators, self.names.get(tuple(rel), tuple(rel)), graph, before)
+
+    # The report as a dictionary: totals per phase, and per relation, most expensive first
+    def report(self):
+        relators = sorted(self.relators.items(), key=lambda item: -item[1][0])
+        return {
+            'phases': {name: dict(zip(self.FIELDS, totals)) for name, totals in self.phases.items()},
+            'relators': [dict(relator=list(rel), **dict(zip(self.FIELDS, totals))) for rel, totals in relators],
+        }
+
+# Print a report from Profile.report() as two tables
+def print_profile(report):
+    from tabulate import tabulate
+    print(tabulate([[name, *totals.values()] for name, totals in report['phases'].items()],
+                   headers=['phase', *Profile.FIELDS]))
+    print()
+    print(tabulate([[r['relator'], *[r[f] for f in Profile.FIELDS]] for r in report['relators']],
+                   headers=['relator', *Profile.FIELDS]))
+
+# Progress callback printing one line per report, and a summary at the end
+def print_progress(stats):
+    if stats['status'] == 'running':
+        print(stats['live'],'*',stats['completed'], '*', stats['elapsed'], "seconds")
+        return
+    if stats['status'] == 'resumed':
+        print('resuming from', stats['checkpoint'], '*', stats['live'], '*', stats['completed'])
+        return
+    if stats['status'] == 'cached':
+        print(stats['live'], 'vertices * from the cache')
+        return
+    if stats['status'] == 'lookahead':
+        print('lookahead', stats['before'], '->', stats['live'], 'vertices')
+        return
+    if stats['status'] == 'relators':
+        (r0, r1), (l0, l1) = stats['relators'], stats['letters']
+        print('relators', r0, '->', r1, '* letters', l0, '->', l1)
+        return
+    if stats['status'] != 'finished':
+        print('stopped:', stats['status'], '*', stats['live'], '*', stats['completed'])
+    print(stats['live'], 'vertices * peak', stats['peak'], 'vertices')
+    print("runtime =", stats['elapsed'], "seconds")
+
+# Progress callback appending each report as a line of JSON to a file,
+# with the extra fields given (e.g. k=-4, strategy='hlt') added to every line
+class JsonlProgress:
+    def __init__(self, path, **fields):
+        self.path = path
+        self.fields = fields
+
+    def __call__(self, stats):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(dict(self.fields, **stats)) + '\n')
+
+# Everything that happens between two steps of an enumeration:
+# progress reports, checkpoints and budget checks.
+# step() returns None, or the reason the run should stop.
+class Monitor:
+    def __init__(self, start, progress=None, report=1.0, checkpoints=None, budget=None):
+        self.start = start
+        self.progress = progress
+        self.interval = report # seconds between progress reports
+        self.checkpoints = checkpoints
+        self.budget = budget
+        self.last = (start, 0) # time and coincidences of the last report
+
+    def step(self, graph, lookahead):
+        if self.progress is not None and time.time() - self.last[0] >= self.interval:
+            self.report(graph, 'running')
+        if self.checkpoints is not None:
+            self.checkpoints.tick(graph, lookahead)
+        if self.budget is not None:
+            status = self.budget.check(graph)
+            if status is not None:
+                if self.checkpoints is not None:
+                    self.checkpoints.save(graph, lookahead)
+                return status
+        return None
+
+    def stats(self, graph, status, now):
+        return {
+            'status': status,
+            'elapsed': now - self.start,
+            'live': graph.size,
+            'completed': graph.completed,
+            'edges': graph.edge_count,
+            'coincidences': graph.coincidences,
+            'peak': graph.peak,
+        }
+
+    # Send the statistics to the progress callback; status defaults to the graph's final status
+    def report(self, graph, status=None):
+        if self.progress is None:
+            return
+        now = time.time()
+        then, coincidences = self.last
+        self.last = (now, graph.coincidences)
+        self.progress(dict(self.stats(graph, status or graph.status, now),
+                           coincidences_per_second=(graph.coincidences - coincidences) / max(now - then, 1e-9)))
+
+    # Send the statistics with a status naming something that happened during the run,
+    # e.g. 'lookahead', and fields of its own
+    def event(self, graph, status, **fields):
+        if self.progress is not None:
+            self.progress(dict(self.stats(graph, status, time.time()), **fields))
+
+# HLT strategy: apply every secondary relation at the smallest incomplete vertex
+# Returns 'finished', or the reason the monitor stopped it
+def hlt(graph, sec, scan, monitor, lookahead=None, compact=True):
+    profile = graph.profile
+    while True:
+        next_vertex = graph.next_incomplete()
+        if next_vertex is None:
+            break
+        for rel in sec:
+            if profile is not None:
+                before = profile.snapshot(graph)
+            if scan:
+                graph.scan_relation(next_vertex, rel)
+            else:
+                graph.add_relation(next_vertex, rel)
+            if profile is not None:
+                profile.relator(rel, graph, before)
+        if lookahead is not None and graph.size > lookahead:
+            lookahead = look_ahead(graph, sec, lookahead, monitor)
+        graph.complete(next_vertex)
+        if compact and graph.sparse():
+            graph.compact()
+        status = monitor.step(graph, lookahead)
+        if status is not None:
+            return status
+
+    return 'finished'
+
+# Felsch strategy: define one edge at a time, at the first undefined (vertex, label),
+# then scan every rotation of every secondary relation through each new edge (deduction)
+# without defining anything, until no deductions are left.
+# Returns 'finished', or the reason the monitor stopped it
+def felsch(graph, sec, monitor, lookahead=None, compact=True):
+    rots = rotations(sec)
+    labels = [w for g in range(1, graph.gen+1) for w in (g, -g)]
+    profile = graph.profile
+
+    next_step = time.time() + STEP_INTERVAL
+    while True:
+        while graph.deductions:
+            # a cascade can run for minutes (a single deduction of a long relator can take
+            # tens of milliseconds), so the monitor also runs every STEP_INTERVAL seconds;
+            # a run stopped here keeps the rest of the deductions, for its checkpoint
+            if time.time() >= next_step:
+                next_step = time.time() + STEP_INTERVAL
+                status = monitor.step(graph, lookahead)
+                if status is not None:
+                    return status
+            s, g = graph.deductions.pop()
+            s = graph.find(s)
+            if graph.forward[g-1][s] < 0:
+                continue # the edge was moved by a merge, and the moved edge is its own deduction
+            for rot, rel in rots.get(g, []):
+                if profile is not None:
+                    before = profile.snapshot(graph)
+                graph.scan_relation(s, rot, define=False)
+                if profile is not None:
+                    profile.relator(rel, graph, before)
+            s = graph.find(s)
+            e = graph.forward[g-1][s]
+            for rot, rel in rots.get(-g, []):
+                if e >= 0:
+                    if profile is not None:
+                        before = profile.snapshot(graph)
+                    graph.scan_relation(e, rot, define=False)
+                    if profile is not None:
+                        profile.relator(rel, graph, before)
+        graph.collapse()
+        if lookahead is not None and graph.size > lookahead:
+            lookahead = look_ahead(graph, sec, lookahead, monitor)
+            continue
+        status = monitor.step(graph, lookahead)
+        if status is not None:
+            return status
+
+        # find the first undefined edge
+        w = 0
+        while True:
+            v = graph.next_incomplete()
+            if v is None:
+                break
+            w = next((w for w in labels if graph.image(v, w) < 0), 0)
+            if w != 0:
+                break
+            graph.complete(v)
+        if w == 0:
+            break
+        if compact and graph.sparse():
+            graph.compact()
+            v = graph.next_incomplete()
+        graph.join(v, graph.new_vertex(), w)
+
+    return 'finished'
+
+# gen is a number of generators
+# init is the list of initial relations a^{g_1g_2...g_k} = b, in the form [a, g_1, ..., g_k, b]
+# sec is the list of secondary relations x^{g_1...g_k} = x, in the form [g_1, ..., g_k]
+# Each generator is represented by an integer from 1 to generators
+# strategy is 'hlt' (complete one vertex at a time) or 'felsch' (one edge at a time)
+# If scan is False, HLT traces each relation along a whole path of new vertices as in add_relations()
+# If lookahead is a number, a lookahead pass runs whenever there are more live vertices than that
+# If compact is True, vertices are renumbered densely whenever most ids belong to merged vertices
+# If checkpoint is a path, the state is saved there every interval seconds, and with resume=True
+# the enumeration continues from the checkpoint there if there is one
+# budget is a Budget; a run it stops keeps its checkpoint, and graph.status says why it stopped
+# progress is called with a dictionary of statistics every report seconds, and once at the end
+# If profile is True, graph.profile is a Profile of the run
+# If prepare is True, the secondary relations are preprocessed by prepare_relators() first,
+# which gives the same graph; what that saved is graph.prepared, and sent to progress as a
+# 'relators' event
+def cayley_graph(gen, init, sec, scan=True, strategy='hlt', lookahead=None, compact=True,
+                 checkpoint=None, interval=600, resume=False, budget=None,
+                 progress=print_progress, report=1.0, profile=False, prepare=True):
+    if strategy not in ('hlt', 'felsch'):
+        raise ValueError(f"unknown strategy {strategy!r}, expected 'hlt' or 'felsch'")
+    checkpoints = None
+    if checkpoint is not None:
+        checkpoints = Checkpoints(checkpoint, cache_key(gen, init, sec), strategy, interval)
+
+    start = time.time()
+    if budget is not None:
+        budget.reset()
+    monitor = Monitor(start, progress, report, checkpoints, budget)
+
+    resumed = checkpoints.load() if resume and checkpoints is not None else None
+    if resumed is not None:
+        graph, lookahead = resumed
+        monitor.event(graph, 'resumed', checkpoint=checkpoint)
+    else:
+        if profile:
+            before = (time.perf_counter(), 0, 0, 0)
+        graph = start_graph(gen, init, strategy)
+        if profile:
+            graph.profile = Profile()
+            graph.profile.phase('initial relations', graph, before)
+    if not profile:
+        graph.profile = None
+    elif graph.profile is None: # resumed from a run that was not profiled
+        graph.profile = Profile()
+
+    # Add the secondary relations to each vertex
+    graph.prepared = None
+    if prepare:
+        if profile: # report each relation as the caller gave it (the first one, for duplicates)
+            graph.profile.names = {tuple(canonical_relator(rel)): tuple(rel) for rel in reversed(sec)}
+        sec, graph.prepared = prepare_relators(sec)
+        monitor.event(graph, 'relators', **graph.prepared)
+    if profile:
+        before = graph.profile.snapshot(graph)
+    if strategy == 'hlt':
+        graph.status = hlt(graph, sec, scan, monitor, lookahead, compact)
+    else:
+        graph.status = felsch(graph, sec, monitor, lookahead, compact)
+    if profile:
+        graph.profile.phase('relators', graph, before)
+    if checkpoints is not None and graph.status == 'finished':
+        checkpoints.remove()
+    monitor.report(graph)
+
+    return graph
+
+# The graph with the loops at the generators and the initial relations
+def start_graph(gen, init, strategy):
+    graph = CayleyGraph(gen)
+    if strategy == 'felsch':
+        graph.deductions = []
+
+    # Add loops at each generator
+    # if computing a rack, rather than a quandle, only add the vertices
+    for g in range(1,gen+1):
+        graph.add_vertex(g)
+        graph.add_edge(g, g, g)
+
+    # Add the initial relations
+    for rel in init:
+        v1 = rel[0]
+        for w in rel[1:len(rel)-2]:
+            v2 = graph.new_vertex()
+            if w > 0: # add all edges with positive labels
+                graph.add_edge(v1, v2, w)
+            else:
+                graph.add_edge(v2, v1, -w)
+            v1 = v2
+        # add the final edge
+        w = rel[len(rel)-2]
+        v2 = rel[len(rel)-1]
+        if w > 0:  # add all edges with positive labels
+            graph.add_edge(v1, v2, w)
+        else:
+            graph.add_edge(v2, v1, -w)
+
+    return graph
+
+# Write a finished graph to a binary file: a header with the metadata as JSON,
+# then the forward table of each generator as int32, with the vertices renumbered 1, 2, ..., size.
+# meta can hold anything JSON can, e.g. the relations and k; gen, size, peak and the
+# vertex of each generator are always added. The header is padded so the tables are
+# 8-byte aligned, which lets open_graph() map them straight from the file.
+def write_graph(graph, path, meta=None):
+    tables, generators = graph.dense_tables()
+    meta = dict(meta or {}, gen=graph.gen, size=graph.size, peak=graph.peak, generators=generators)
+    header = json.dumps(meta).encode()
+    header += b' ' * (-(len(GRAPH_MAGIC) + 4 + len(header)) % 8)
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'wb') as f:
+        f.write(GRAPH_MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for table in tables:
+            table.tofile(f)
+    os.replace(temp, path) # so other processes never see a half-written file
+
+# A graph file written by write_graph(), memory-mapped rather than read.
+# Opening it only parses the header; the tables are paged in from the file as they are used.
+#   with GraphFile(path) as f:
+#       f.meta['k'], f.size, f.table(1)[v], f.edges(), f.as_numpy()
+class GraphFile:
+    def __init__(self, path):
+        import mmap
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(GRAPH_MAGIC)) != GRAPH_MAGIC:
+                raise ValueError(f'{path} is not a graph file')
+            field = f.read(4)
+            if len(field) < 4:
+                raise ValueError(f'{path} is truncated')
+            length, = struct.unpack('<I', field)
+            header = f.read(length)
+            if len(header) < length:
+                raise ValueError(f'{path} is truncated')
+            self.meta = json.loads(header)
+            self.offset = len(GRAPH_MAGIC) + 4 + length # start of the tables
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < self.offset + self.meta['gen']*(self.meta['size']+1)*4:
+            self.map.close()
+            raise ValueError(f'{path} is truncated')
+        self.gen = self.meta['gen']
+        self.size = self.meta['size']
+        self.generators = self.meta['generators']
+        self.tables = {} # label: memoryview of its table, made on first use
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # The views handed out by table() have to be released before the file can be closed
+    def close(self):
+        for view in self.tables.values():
+            view.release()
+        self.tables = {}
+        self.map.close()
+
+    # The bytes of the forward table of generator g, indexed by vertex (entry 0 unused)
+    def raw(self, g):
+        start = self.offset + (g-1)*(self.size+1)*4
+        return memoryview(self.map)[start:start + (self.size+1)*4]
+
+    # The forward table of generator g as a read-only int view: table(g)[v] is v acted on by g
+    def table(self, g):
+        if g not in self.tables:
+            self.tables[g] = self.raw(g).cast('i')
+        return self.tables[g]
+
+    def vertices(self):
+        return set(range(1, self.size+1))
+
+    # The edges as a list of triples (start, end, label), like CayleyGraph.edges()
+    def edges(self):
+        return [(start, end, g) for g in range(1, self.gen+1)
+                for start, end in enumerate(self.table(g)) if end >= 0]
+
+    # The forward tables as int32 NumPy arrays mapped from the file, without copying.
+    # Delete the arrays before closing the file.
+    def as_numpy(self):
+        import numpy as np
+        return [np.frombuffer(self.map, dtype=np.int32, count=self.size+1,
+                              offset=self.offset + g*(self.size+1)*4) for g in range(self.gen)]
+
+    # Copy the tables into a CayleyGraph
+    def graph(self):
+        forward = []
+        for g in range(1, self.gen+1):
+            table = array('i')
+            with self.raw(g) as raw:
+                table.frombytes(raw)
+            forward.append(table)
+        graph = CayleyGraph.from_tables(forward, self.generators)
+        graph.peak = self.meta['peak']
+        return graph
+
+# Read a graph written by write_graph(), returns the graph and its metadata
+def read_graph(path):
+    with GraphFile(path) as f:
+        return f.graph(), f.meta
+
+# The cache key of a presentation: a hash of the presentation and the engine version
+def cache_key(gen, init, sec):
+    text = json.dumps([ENGINE_VERSION, gen, init, sec], separators=(',', ':'))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+# The options of cayley_graph() that change how a graph is found, so its peak, with their
+# defaults. They are stored with each cached graph.
+RUN_OPTIONS = {'strategy': 'hlt', 'scan': True, 'lookahead': None, 'compact': True, 'prepare': True}
+
+def run_options(options):
+    return {name: options.get(name, default) for name, default in RUN_OPTIONS.items()}
+
+# The cached graph for a key, or None. Its peak is None (unknown) unless it was found with
+# the run options given, see run_options()
+def cache_load(key, options=None):
+    path = os.path.join(CACHE_DIR, key + '.graph')
+    try:
+        graph, meta = read_graph(path)
+    except (FileNotFoundError, ValueError):
+        return None
+    try:
+        os.utime(path) # mark it as recently used
+    except FileNotFoundError: # evicted by another process since it was read
+        pass
+    graph.cached = True
+    if options is None or meta.get('options') != options:
+        graph.peak = None
+    return graph
+
+def cache_store(key, graph, meta=None):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    write_graph(graph, os.path.join(CACHE_DIR, key + '.graph'), meta)
+    cache_evict()
+
+# Delete the least recently used graphs until the cache is at most limit bytes
+def cache_evict(limit=None):
+    if limit is None:
+        limit = CACHE_LIMIT
+    files = []
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith('.graph'):
+            try:
+                st = os.stat(os.path.join(CACHE_DIR, name))
+            except FileNotFoundError: # evicted by another process
+                continue
+            files.append((st.st_mtime, st.st_size, name))
+    total = sum(size for _, size, _ in files)
+    for _, size, name in sorted(files):
+        if total <= limit:
+            break
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+        except FileNotFoundError:
+            pass
+        total -= size
+
+# cayley_graph(), skipped when the presentation is in the cache.
+# The key is the presentation only, so a graph found with other options (e.g. the other
+# strategy) is still used, but its peak is None, see cache_load()
+def cached_graph(gen, init, sec, **options):
+    key = cache_key(gen, init, sec)
+    graph = cache_load(key, run_options(options))
+    if graph is not None:
+        Monitor(time.time(), options.get('progress', print_progress)).event(graph, 'cached', key=key)
+        return graph
+    graph = cayley_graph(gen, init, sec, **options)
+    if graph.status == 'finished': # partial graphs are never cached
+        cache_store(key, graph, {'init': init, 'sec': sec, 'options': run_options(options)})
+    return graph
+
+# options are passed on to cayley_graph()
+# If profile is True, the cache is not used and a Profile report is returned as well
+# The vertices are always numbered 1, ..., size, as in a graph loaded from the cache
+# Raises RuntimeError if a budget stopped the enumeration, rather than return a partial graph
+def q_graph(gen, k, cache=True, profile=False, **options):
+    init = presentation(gen, k)
+    sec = secondary_relations(gen, init)
+    if profile:
+        graph = cayley_graph(gen, init, sec, profile=True, **options)
+        check_finished(graph)
+        graph.collapse()
+        graph.compact() # profiled as a rewrite itself
+        before = graph.profile.snapshot(graph)
+        Vertices, Edges = graph.vertices(), graph.edges()
+        graph.profile.phase('rewrite', graph, before)
+        return Vertices, Edges, graph.profile.report()
+    if cache:
+        graph = cached_graph(gen, init, sec, **options)
+    else:
+        graph = cayley_graph(gen, init, sec, **options)
+    check_finished(graph)
+    graph.collapse()
+    graph.compact()
+    return graph.vertices(), graph.edges()
+
+def check_finished(graph):
+    if graph.status != 'finished':
+        raise RuntimeError(f'the enumeration stopped: {graph.status}, at {graph.size} vertices')
+
+# Impose more relations on a finished graph, in place.
+# Each initial relation [a, *word, b] is traced from the vertex of generator a, adding
+# vertices only where an edge is missing, and its end is merged with the vertex of b.
+# Then every vertex is scanned again with the secondary relations sec, from the first.
+# A merge maps every relation that held onto the merged graph, so the secondary relations
+# the graph was finished with still hold and only sec has to be scanned, unless the
+# initial relations added vertices: then all_sec is scanned instead.
+# Returns 'finished', or the reason the monitor stopped it
+def extend_graph(graph, init, sec, all_sec, monitor, compact=True):
+    created = graph.created
+    graph.deductions = None
+    for rel in init:
+        v = graph.find(graph.generators[rel[0]-1])
+        for w in rel[1:-1]:
+            u = graph.image(v, w)
+            if u < 0:
+                u = graph.new_vertex()
+                graph.join(v, u, w)
+                graph.collapse()
+            v = graph.find(u)
+        graph.pending.append((v, graph.generators[rel[-1]-1]))
+        graph.collapse()
+    if graph.created > created:
+        sec = all_sec
+    graph.position = 1
+    graph.completed = 0
+    return hlt(graph, sec, True, monitor, compact=compact)
+
+# The graph of a presentation with more relations, extra_init and extra_sec, found from
+# the finished graph of (gen, init, sec) instead of from scratch. Adding relations can
+# only merge elements, so this costs the coincidences and one scan of every element,
+# rather than a whole enumeration. The base graph comes from cached_graph() (options are
+# passed on to it) and the result is cached under the extended presentation.
+# If sec is None, both presentations get theirs from secondary_relations(), as q_graph
+# does, and extra_sec is the relations that adds.
+def extended_graph(gen, init, extra_init, sec=None, extra_sec=(), cache=True,
+                   progress=print_progress, report=1.0, budget=None, **options):
+    if sec is None:
+        sec = secondary_relations(gen, init)
+        extra_sec = secondary_relations(gen, init + extra_init)[len(sec):] + list(extra_sec)
+    all_init, all_sec = init + list(extra_init), sec + list(extra_sec)
+    key = cache_key(gen, all_init, all_sec)
+    # the extension is not a whole enumeration, so it is stored under options of its own
+    extended = dict(run_options(options), base=cache_key(gen, init, sec))
+    if cache:
+        graph = cache_load(key, extended)
+        if graph is not None:
+            Monitor(time.time(), progress).event(graph, 'cached', key=key)
+            return graph
+        graph = cached_graph(gen, init, sec, progress=progress, report=report, budget=budget, **options)
+    else:
+        graph = cayley_graph(gen, init, sec, progress=progress, report=report, budget=budget, **options)
+    if graph.status != 'finished':
+        return graph
+
+    start = time.time()
+    if budget is not None:
+        budget.reset()
+    monitor = Monitor(start, progress, report, None, budget)
+    graph.peak = graph.size # the peak of the extension
+    graph.cached = False
+    scan_sec, scan_all = extra_sec, all_sec
+    if options.get('prepare', True):
+        scan_sec, scan_all = prepare_relators(extra_sec)[0], prepare_relators(all_sec)[0]
+    graph.status = extend_graph(graph, extra_init, scan_sec, scan_all, monitor, options.get('compact', True))
+    monitor.report(graph)
+    if cache and graph.status == 'finished':
+        cache_store(key, graph, {'init': all_init, 'sec': all_sec, 'options': extended})
+    return graph
+
+# Enumerate one presentation in a child process and send back its statistics
+def enumerate_job(conn, gen, init, sec, memory, cache, options):
+    if memory is not None:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    sys.stdout = open(os.devnull, 'w') # keep the progress lines of the workers apart
+    start = time.time()
+    start_rss = rss() # a forked child starts with the parent's peak, so rss() alone says little about the job
+    try:
+        if sec is None:
+            sec = secondary_relations(gen, init)
+        if cache:
+            graph = cached_graph(gen, init, sec, **options)
+        else:
+            graph = cayley_graph(gen, init, sec, **options)
+        conn.send({'size': graph.size, 'runtime': time.time()-start, 'peak': graph.peak, 'rss': rss(),
+                   'rss_growth': rss() - start_rss, 'cached': graph.cached, 'status': 'ok' if graph.status == 'finished' else graph.status})
+    except MemoryError:
+        conn.send({'runtime': time.time()-start, 'status': 'out of memory'})
+    except Exception as e:
+        conn.send({'runtime': time.time()-start, 'status': f'error: {e}'})
+    conn.close()
+
+# Enumerate each job (gen, init, sec) in its own process, at most processes at a time,
+# and yield (number of the job, statistics) as each one finishes. If sec is None it is
+# built with secondary_relations(). Jobs are read from the iterable only as workers free up.
+# Jobs running longer than timeout seconds are killed, and memory caps each job's
+# address space in bytes. rss is the peak RSS of the job's process, which includes what it
+# inherited when it was forked; rss_growth is only what the job added to it.
+def run_jobs(jobs, processes=None, timeout=None, memory=None, cache=True, **options):
+    if processes is None:
+        processes = os.cpu_count()
+    jobs = enumerate(jobs)
+    running = {} # number: (process, connection, start time)
+    more = True
+
+    while more or running:
+        while more and len(running) < processes:
+            try:
+                n, (gen, init, sec) = next(jobs)
+            except StopIteration:
+                more = False
+                break
+            recv, send = multiprocessing.Pipe(duplex=False)
+            p = multiprocessing.Process(target=enumerate_job, args=(send, gen, init, sec, memory, cache, options), daemon=True)
+            p.start()
+            send.close()
+            running[n] = (p, recv, time.time())
+        if not running:
+            break
+
+        wait([recv for _, recv, _ in running.values()], timeout=0.1)
+        for n, (p, recv, started) in list(running.items()):
+            if recv.poll():
+                try:
+                    result = recv.recv()
+                except EOFError: # the process died without reporting, e.g. killed for its memory use
+                    result = {'runtime': time.time()-started, 'status': 'crashed'}
+            elif timeout is not None and time.time()-started > timeout:
+                p.kill()
+                result = {'runtime': time.time()-started, 'status': 'timeout'}
+            else:
+                continue
+            p.join()
+            recv.close()
+            del running[n]
+            yield n, result
+
+# Run q_graph for every k in ks in parallel with run_jobs().
+# The summary table is printed, written to summary if given, and returned as a list of rows.
+# For the k served from the cache the runtime is only the time to load the graph, and the
+# peak is only known if it was found with the same options.
+def sweep(ks, gen=3, processes=None, timeout=None, memory=None, summary=None, cache=True, **options):
+    ks = list(ks)
+    jobs = [(gen, presentation(gen, k), None) for k in ks]
+    results = dict(run_jobs(jobs, processes, timeout, memory, cache, **options))
+
+    rows = []
+    for n, k in enumerate(ks):
+        r = results[n]
+        rows.append([k, gen, r.get('size'), round(r['runtime'], 3), r.get('peak'), r.get('cached'), r['status']])
+    from tabulate import tabulate
+    table = tabulate(rows, headers=['k', 'gen', 'size', 'runtime (s)', 'peak vertices', 'from cache', 'status'])
+    print(table)
+    if summary is not None:
+        with open(summary, 'w') as f:
+            f.write(table + '\n')
+    return rows
@@ -0,0 +1,259 @@
+# Differential fuzzing of the enumeration engine in cayley.py against legacy_graph(),
+# the original collapse()/add_relations() implementation.
+# Random small presentations are enumerated with both, and the quandle sizes and the graphs
+# (up to renumbering the vertices) have to agree. A failing presentation is shrunk to a
+# minimal one and printed, so it can be replayed with --replay.
+#
+#   python fuzz.py                      200 random presentations
+#   python fuzz.py --cases 1000 --seed 7
+#   python fuzz.py --replay '[3, [[1, 2, 3], [2, 3, 1]], [[1, 2, 1, 2]]]'
+
+import sys
+import json
+import time
+import random
+import argparse
+import multiprocessing
+from collections import deque
+import cayley
+
+# The engine configurations checked against the legacy graph, name: options for cayley_graph()
+CONFIGS = {
+    'hlt': {'strategy': 'hlt'},
+    'hlt define': {'strategy': 'hlt', 'scan': False},
+    'hlt lookahead': {'strategy': 'hlt', 'lookahead': 16},
+    'hlt no compaction': {'strategy': 'hlt', 'compact': False},
+    'hlt unprepared': {'strategy': 'hlt', 'prepare': False},
+    'felsch': {'strategy': 'felsch'},
+    'felsch lookahead': {'strategy': 'felsch', 'lookahead': 16},
+}
+
+# A case is (gen, init, extra): the secondary relations are secondary_relations(gen, init),
+# as q_graph builds them, followed by the extra relations.
+def relations(case):
+    gen, init, extra = case
+    return cayley.secondary_relations(gen, init) + extra
+
+def random_word(rng, gen, length):
+    return [rng.choice([1, -1]) * rng.randint(1, gen) for _ in range(length)]
+
+def random_case(rng, max_gen=4, max_length=8, max_relators=3, extra=0.5):
+    gen = rng.randint(2, max_gen)
+    init = [[rng.randint(1, gen), *random_word(rng, gen, rng.randint(1, max_length)), rng.randint(1, gen)]
+            for _ in range(rng.randint(1, max_relators))]
+    extras = []
+    while rng.random() < extra:
+        extras.append(random_word(rng, gen, rng.randint(1, max_length)))
+    return gen, init, extras
+
+# A canonical form of a graph given by its edges (start, end, label): the vertices of each
+# connected component are numbered in breadth first order over the labels 1, -1, 2, -2, ...
+# from every possible starting vertex, and the smallest numbering is kept.
+# Edges with the same label never share a start or an end, so two graphs have the same
+# canonical form exactly when they are the same up to renumbering the vertices.
+def canonical(gen, edges):
+    step = {}
+    neighbours = {}
+    for start, end, label in edges:
+        step[(start, label)] = end
+        step[(end, -label)] = start
+        neighbours.setdefault(start, set()).add(end)
+        neighbours.setdefault(end, set()).add(start)
+    labels = [w for g in range(1, gen+1) for w in (g, -g)]
+
+    def numbering(root):
+        order = {root: 0}
+        queue = deque([root])
+        form = []
+        while queue:
+            v = queue.popleft()
+            for w in labels:
+                u = step.get((v, w))
+                if u is None:
+                    form.append(-1)
+                    continue
+                if u not in order:
+                    order[u] = len(order)
+                    queue.append(u)
+                form.append(order[u])
+        return tuple(form), order
+
+    components = []
+    seen = set()
+    for v in sorted(neighbours):
+        if v in seen:
+            continue
+        form, order = numbering(v)
+        seen.update(order)
+        components.append(min(numbering(u)[0] for u in order))
+    return sorted(components)
+
+class StaleVertex(Exception):
+    pass
+
+# Enumerate a case with the legacy engine in a child process and send back (size, canonical form).
+# add_relations() keeps tracing relations from its vertex after an earlier relation merged
+# that vertex away, which leaves edges at a vertex that no longer exists (and can crash
+# collapse()). The result is meaningless then, so the relations are added one at a time,
+# which is the same computation, and 'stale' is sent back instead.
+def legacy_job(conn, case):
+    gen, init, _ = case
+    add_relations = cayley.add_relations
+    def checked(vertex, relations, Vertices, Edges):
+        for rel in relations:
+            if vertex not in Vertices:
+                raise StaleVertex
+            Vertices, Edges = add_relations(vertex, [rel], Vertices, Edges)
+        return Vertices, Edges
+    cayley.add_relations = checked
+    try:
+        Vertices, Edges = cayley.legacy_graph(gen, init, relations(case))
+        conn.send((len(Vertices), canonical(gen, Edges)))
+    except StaleVertex:
+        conn.send('stale')
+    except Exception as e:
+        conn.send(f'{type(e).__name__}: {e}')
+    conn.close()
+
+# The legacy engine can run forever, so it gets timeout seconds. Returns None if it ran out.
+def legacy(case, timeout):
+    recv, send = multiprocessing.Pipe(duplex=False)
+    p = multiprocessing.Process(target=legacy_job, args=(send, case), daemon=True)
+    p.start()
+    send.close()
+    result = recv.recv() if recv.poll(timeout) else None
+    p.kill()
+    p.join()
+    recv.close()
+    return result
+
+# Run every configuration on a case and compare it with the legacy engine.
+# Returns None if they all agree, a description of the first disagreement, 'skipped'
+# if the quandle is too big for the legacy engine (more than limit elements, or more
+# than timeout seconds), or 'legacy stale' if the legacy result is meaningless, see legacy_job().
+def check(case, configs=CONFIGS, limit=150, timeout=30):
+    gen, init, _ = case
+    sec = relations(case)
+    results = {}
+    for name, options in configs.items():
+        budget = cayley.Budget(max_vertices=20*limit)
+        try:
+            graph = cayley.cayley_graph(gen, init, sec, budget=budget, progress=None, **options)
+        except Exception as e:
+            return f'{name}: {type(e).__name__}: {e}'
+        if graph.status != 'finished':
+            if graph.size > limit:
+                return 'skipped'
+            return f'{name}: stopped with {graph.status} at {graph.size} vertices'
+        if graph.size != len(graph.vertices()):
+            return f'{name}: size {graph.size} but {len(graph.vertices())} live vertices'
+        results[name] = (graph.size, canonical(gen, graph.edges()))
+    if max(size for size, _ in results.values()) > limit:
+        return 'skipped'
+
+    reference = legacy(case, timeout)
+    if reference is None:
+        return 'skipped'
+    if reference == 'stale':
+        return 'legacy stale'
+    if isinstance(reference, str):
+        return f'legacy engine: {reference}'
+    for name, (size, form) in results.items():
+        if size != reference[0]:
+            return f'{name}: {size} elements, legacy {reference[0]}'
+        if form != reference[1]:
+            return f'{name}: {size} elements as legacy, but a different graph'
+    return None
+
+# The results of check() that are not failures
+PASSED = (None, 'skipped', 'legacy stale')
+
+# Smaller versions of a case: with one relation fewer, one letter fewer, a label replaced
+# by a smaller one, or with the largest generator dropped if nothing uses it
+def reductions(case):
+    gen, init, extra = case
+    for i in range(len(init)):
+        yield gen, init[:i] + init[i+1:], extra
+    for i in range(len(extra)):
+        yield gen, init, extra[:i] + extra[i+1:]
+    for i, rel in enumerate(init):
+        for j in range(1, len(rel)-1):
+            if len(rel) > 3:
+                yield gen, init[:i] + [rel[:j] + rel[j+1:]] + init[i+1:], extra
+    for i, rel in enumerate(extra):
+        for j in range(len(rel)):
+            if len(rel) > 1:
+                yield gen, init, extra[:i] + [rel[:j] + rel[j+1:]] + extra[i+1:]
+    for i, rel in enumerate(init):
+        for j in range(len(rel)):
+            w = abs(rel[j])
+            if w > 1:
+                yield gen, init[:i] + [rel[:j] + [(w-1) if rel[j] > 0 else -(w-1)] + rel[j+1:]] + init[i+1:], extra
+    for i, rel in enumerate(extra):
+        for j in range(len(rel)):
+            if rel[j] < 0:
+                yield gen, init, extra[:i] + [rel[:j] + [-rel[j]] + rel[j+1:]] + extra[i+1:]
+    letters = [abs(w) for rel in init + extra for w in rel]
+    if gen > 1 and gen not in letters:
+        yield gen-1, init, extra
+
+# Shrink a failing case greedily, taking the first reduction that still fails, until none does
+def shrink(case, **options):
+    failure = check(case, **options)
+    progress = True
+    while progress:
+        progress = False
+        for smaller in reductions(case):
+            result = check(smaller, **options)
+            if result not in PASSED:
+                case, failure = smaller, result
+                progress = True
+                break
+    return case, failure
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the enumeration engine against legacy_graph() on random presentations')
+    parser.add_argument('--cases', type=int, default=200, help='number of random presentations')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--max-gen', type=int, default=4)
+    parser.add_argument('--max-length', type=int, default=8, help='longest relation word')
+    parser.add_argument('--max-relators', type=int, default=3, help='most initial relations')
+    parser.add_argument('--extra', type=float, default=0.5, help='chance of each further extra secondary relation')
+    parser.add_argument('--limit', type=int, default=150, help='largest quandle checked against the legacy engine')
+    parser.add_argument('--timeout', type=float, default=30, help='seconds allowed for the legacy engine')
+    parser.add_argument('--only', help='only check the configurations whose name contains this')
+    parser.add_argument('--replay', help='check one case, given as JSON [gen, init, extra]')
+    args = parser.parse_args()
+
+    configs = {name: options for name, options in CONFIGS.items() if args.only is None or args.only in name}
+    options = {'configs': configs, 'limit': args.limit, 'timeout': args.timeout}
+
+    if args.replay is not None:
+        gen, init, extra = json.loads(args.replay)
+        failure = check((gen, init, extra), **options)
+        print(failure or 'ok')
+        sys.exit(0 if failure in PASSED else 1)
+
+    seed = args.seed if args.seed is not None else random.randrange(2**32)
+    rng = random.Random(seed)
+    print('seed', seed)
+    start = time.time()
+    checked = skipped = stale = 0
+    for n in range(args.cases):
+        case = random_case(rng, args.max_gen, args.max_length, args.max_relators, args.extra)
+        failure = check(case, **options)
+        if failure == 'skipped':
+            skipped += 1
+            continue
+        if failure == 'legacy stale':
+            stale += 1
+            continue
+        checked += 1
+        if failure is not None:
+            print('case', n, 'failed:', failure)
+            case, failure = shrink(case, **options)
+            print('shrunk to', json.dumps(list(case)))
+            print(failure)
+            sys.exit(1)
+    print(checked, 'presentations agree with the legacy engine,', skipped, 'skipped as too big,',
+          stale, 'skipped as the legacy engine traced from a merged vertex *', round(time.time()-start, 1), 'seconds')
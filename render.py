@@ -0,0 +1,366 @@
+# Drawing Cayley graphs: fixed layouts computed here, so the HTML viewer can show the graph
+# straight away with physics turned off instead of running a force simulation in the browser.
+# The layouts are seeded, so a graph is laid out the same way every time.
+# write_html() streams the page straight from the action tables, using the vis-network
+# copy in lib/ rather than building it in memory with pyvis, and write_clustered_html()
+# writes a page that starts from clusters of vertices, for graphs too big to draw whole.
+
+import os
+import html
+import numpy as np
+
+CLUSTER_LIMIT = 5000 # larger graphs are drawn as clusters, see write_clustered_html()
+SPRING_LIMIT = 1000 # larger graphs are laid out with graphviz, spring_layout() is n^2 per step
+EDGE_LENGTH = 100 # pixels
+LIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib')
+LABELS = 'abcdefghijklmnopqrstuvwxyz'
+COLORS = ['#ff0000', '#00ff00', '#0000ff'] # of a, b and c, the other generators are blue
+CHUNK = 1 << 16 # numbers written at a time
+
+# Force-directed (Fruchterman-Reingold) layout of vertices 0, ..., n-1 joined by pairs,
+# an int array of shape (m, 2). Each step computes all the pairwise repulsions at once,
+# with matrix products rather than an n x n x 2 array of differences.
+# Returns the positions as an (n, 2) array.
+def spring_layout(n, pairs, iterations=200, seed=0):
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2)) * np.sqrt(n)
+    if n < 2:
+        return pos
+    start, end = pairs[:, 0], pairs[:, 1]
+    temperature = np.sqrt(n) / 10
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        # repulsion 1/d between every pair: the sum over j of (p_i - p_j) / d_ij^2
+        square = (pos**2).sum(axis=1)
+        inverse = square[:, None] + square[None, :] - 2 * pos @ pos.T
+        np.fill_diagonal(inverse, np.inf)
+        np.maximum(inverse, 1e-4, out=inverse)
+        np.reciprocal(inverse, out=inverse)
+        force = pos * inverse.sum(axis=1)[:, None] - inverse @ pos
+        # attraction d^2 along the edges
+        pull = pos[start] - pos[end]
+        pull *= np.sqrt((pull**2).sum(axis=1))[:, None]
+        for axis in range(2):
+            force[:, axis] += np.bincount(end, pull[:, axis], n) - np.bincount(start, pull[:, axis], n)
+        length = np.maximum(np.sqrt((force**2).sum(axis=1)), 1e-9)
+        pos += force / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature -= cooling
+    return pos
+
+# Layout with graphviz through pygraphviz, for graphs too big for spring_layout()
+def graphviz_layout(n, pairs, prog='sfdp'):
+    import networkx as nx
+    from networkx.drawing.nx_agraph import graphviz_layout
+    graph = nx.Graph()
+    graph.add_nodes_from(range(n))
+    graph.add_edges_from(pairs.tolist())
+    positions = graphviz_layout(graph, prog=prog)
+    return np.array([positions[v] for v in range(n)])
+
+# Positions of vertices 0, ..., n-1 joined by pairs as an (n, 2) array in pixels, centred,
+# with a typical edge scale pixels long.
+# method is 'spring', 'graphviz', or 'auto' to use spring_layout() up to SPRING_LIMIT vertices.
+def place(n, pairs, method='auto', seed=0, scale=EDGE_LENGTH):
+    if method == 'auto':
+        method = 'spring' if n <= SPRING_LIMIT else 'graphviz'
+    if method == 'spring':
+        pos = spring_layout(n, pairs, seed=seed)
+    elif method == 'graphviz':
+        pos = graphviz_layout(n, pairs)
+    else:
+        raise ValueError(f"unknown layout {method!r}, expected 'spring', 'graphviz' or 'auto'")
+    if len(pairs):
+        typical = np.median(np.sqrt(((pos[pairs[:, 0]] - pos[pairs[:, 1]])**2).sum(axis=1)))
+        pos = pos / max(typical, 1e-9)
+    return (pos - pos.mean(axis=0)) * scale
+
+# The action tables of a graph, table[g-1][v] = v acted on by g for v = 1, ..., n (entry 0 unused).
+# graph is a finished CayleyGraph or a GraphFile.
+# For the output of q_graph, use cayley.edge_tables(Vertices, Edges, gen)[0].
+def graph_tables(graph):
+    if hasattr(graph, 'dense_tables'): # a CayleyGraph
+        return graph.dense_tables()[0]
+    return [graph.table(g) for g in range(1, graph.gen+1)]
+
+# The pairs of vertices joined by an edge, 0-based, for place()
+def table_pairs(tables):
+    n = len(tables[0]) - 1
+    start = np.tile(np.arange(n), len(tables))
+    end = np.concatenate([np.asarray(t)[1:] for t in tables]) - 1
+    keep = (end >= 0) & (end != start)
+    pairs = np.stack([np.minimum(start, end)[keep], np.maximum(start, end)[keep]], axis=1)
+    return np.unique(pairs, axis=0)
+
+# Show clusters as single nodes until they are opened, see write_clustered_html()
+CLUSTER_TAIL = """
+var n = tables[0].length - 1;
+var members = sizes.map(function () { return []; });
+for (var v = 1; v <= n; v++) members[cluster[v]].push(v);
+var open = new Set();
+var nodes = new vis.DataSet(), edges = new vis.DataSet();
+function shown(v) { return open.has(cluster[v]) ? v : 'c' + cluster[v]; }
+function clusterNode(c) {
+    return {id: 'c' + c, label: String(sizes[c]), title: sizes[c] + ' vertices, double click to open',
+            shape: 'dot', size: 10 + 3*Math.sqrt(sizes[c]), x: cx[c], y: cy[c]};
+}
+// the edges between the nodes shown: between two closed clusters one per label, as counted
+// in Python, and every edge at a vertex of an open cluster
+function drawEdges() {
+    var list = [], seen = new Set();
+    for (var i = 0; i < qa.length; i++) {
+        if (!open.has(qa[i]) && !open.has(qb[i])) {
+            list.push({id: 'q' + i, from: 'c' + qa[i], to: 'c' + qb[i], label: labels[ql[i]-1],
+                       color: colors[ql[i]-1], width: 1 + Math.log(qn[i]), title: qn[i] + ' edges'});
+        }
+    }
+    open.forEach(function (c) {
+        members[c].forEach(function (v) {
+            for (var g = 0; g < tables.length; g++) {
+                var w = tables[g][v];
+                if (w < 0) continue;
+                // the edge leaving v, and the one coming in, which may be from a closed cluster
+                [[v, shown(w)], [shown(inverse[g][v]), v]].forEach(function (e) {
+                    var key = e[0] + ' ' + e[1] + ' ' + g;
+                    if (seen.has(key)) return;
+                    seen.add(key);
+                    list.push({id: key, from: e[0], to: e[1], label: labels[g], color: colors[g], width: 4});
+                });
+            }
+        });
+    });
+    edges.clear();
+    edges.add(list);
+}
+var inverse = tables.map(function (table) {
+    var inv = new Int32Array(table.length).fill(-1);
+    for (var v = 1; v < table.length; v++) if (table[v] > 0) inv[table[v]] = v;
+    return inv;
+});
+for (var c = 0; c < sizes.length; c++) nodes.add(clusterNode(c));
+drawEdges();
+var options = {
+    physics: {enabled: false},
+    edges: {smooth: {enabled: true, type: 'curvedCW'}},
+    layout: {improvedLayout: false}
+};
+var network = new vis.Network(document.getElementById('mynetwork'), {nodes: nodes, edges: edges}, options);
+network.on('doubleClick', function (params) {
+    if (!params.nodes.length) return;
+    var id = params.nodes[0];
+    if (typeof id === 'string') { // open a cluster
+        var c = Number(id.slice(1));
+        open.add(c);
+        nodes.remove(id);
+        nodes.add(members[c].map(function (v) {
+            return {id: v, label: String(v), shape: 'circle', size: 10, x: x[v-1], y: y[v-1]};
+        }));
+    } else { // fold the cluster of a vertex up again
+        var c = cluster[id];
+        open.delete(c);
+        nodes.remove(members[c]);
+        nodes.add(clusterNode(c));
+    }
+    drawEdges();
+});
+</script>
+</body>
+</html>
+"""
+
+# Write a JSON array of numbers a chunk at a time
+def write_array(f, values):
+    f.write('[')
+    for i in range(0, len(values), CHUNK):
+        if i:
+            f.write(',')
+        chunk = values[i:i+CHUNK]
+        if isinstance(chunk, np.ndarray):
+            chunk = chunk.tolist()
+        f.write(','.join(map(str, chunk)))
+    f.write(']')
+
+PAGE_HEAD = """<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<link rel="stylesheet" href="{lib}/vis-9.1.2/vis-network.css">
+<script src="{lib}/vis-9.1.2/vis-network.min.js"></script>
+<style>#mynetwork {{ width: 100%; height: {height}; border: 1px solid lightgray; }}</style>
+</head>
+<body>
+<div id="mynetwork"></div>
+<script>
+"""
+
+# Build the nodes and edges in the browser from the tables, x and y, labels and colors
+PAGE_TAIL = """
+var nodes = [], edges = [];
+for (var v = 1; v < tables[0].length; v++) {
+    var node = {id: v, label: String(v), shape: 'circle', size: 10, title: ''};
+    if (x.length) { node.x = x[v-1]; node.y = y[v-1]; }
+    nodes.push(node);
+}
+for (var g = 0; g < tables.length; g++) {
+    for (var v = 1; v < tables[g].length; v++) {
+        if (tables[g][v] >= 0) {
+            edges.push({from: v, to: tables[g][v], label: labels[g], color: colors[g], width: 4});
+        }
+    }
+}
+var options = {
+    physics: {enabled: x.length == 0},
+    edges: {smooth: {enabled: true, type: 'curvedCW'}}, // keeps the edges x -> y and y -> x apart
+    layout: {improvedLayout: x.length == 0 && nodes.length < 1000}
+};
+var network = new vis.Network(document.getElementById('mynetwork'),
+                              {nodes: new vis.DataSet(nodes), edges: new vis.DataSet(edges)}, options);
+</script>
+</body>
+</html>
+"""
+
+# The start of a page and the data every page has: labels, colors, x, y and tables
+def write_page_data(f, tables, path, positions, title, height):
+    lib = os.path.relpath(LIB, os.path.dirname(os.path.abspath(path))).replace(os.sep, '/')
+    f.write(PAGE_HEAD.format(title=html.escape(title), lib=lib, height=height))
+    f.write('var labels = "%s";\n' % LABELS[:len(tables)])
+    f.write('var colors = %s;\n' % str([COLORS[g] if g < len(COLORS) else 'blue' for g in range(len(tables))]))
+    for name, axis in (('x', 0), ('y', 1)):
+        f.write(f'var {name} = ')
+        write_array(f, [] if positions is None else np.round(positions[:, axis]).astype(np.int64))
+        f.write(';\n')
+    f.write('var tables = [')
+    for g, table in enumerate(tables):
+        if g:
+            f.write(',\n')
+        write_array(f, table)
+    f.write('];\n')
+
+# Write an HTML page showing the graph with the action tables tables (see graph_tables()).
+# positions is an (n, 2) array from place(), or None to let the browser lay the graph out.
+# The tables and positions are streamed to the file in chunks, never as one big string.
+def write_html(tables, path, positions=None, title='', height='1500px'):
+    with open(path, 'w') as f:
+        write_page_data(f, tables, path, positions, title, height)
+        f.write(PAGE_TAIL)
+
+# Clusters for the level of detail view.
+# A clustering is an int array giving the cluster of each vertex 1, ..., n (entry 0 unused),
+# numbered 0, 1, ... in order of their smallest vertex.
+
+# Number the clusters of root, where root[v] is a representative of v's cluster
+def number_clusters(root):
+    _, first, cluster = np.unique(root[1:], return_index=True, return_inverse=True)
+    order = np.argsort(np.argsort(first)) # renumber by smallest vertex
+    return np.concatenate([[-1], order[cluster]])
+
+# The orbits of the vertices under the generators in labels (1, ..., gen), by union-find
+def orbits(tables, labels):
+    n = len(tables[0]) - 1
+    parent = list(range(n+1))
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+    for g in labels:
+        for v, w in enumerate(tables[g-1]):
+            if v > 0 and w > 0:
+                a, b = find(v), find(w)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+    return number_clusters(np.array([find(v) for v in range(n+1)]))
+
+# The vertices in breadth first order over all the generators, from vertex 1 and then
+# from the first vertex not reached yet
+def bfs_order(tables):
+    n = len(tables[0]) - 1
+    seen = np.zeros(n+1, dtype=bool)
+    order = []
+    for root in range(1, n+1):
+        if seen[root]:
+            continue
+        seen[root] = True
+        start = len(order)
+        order.append(root)
+        i = start
+        while i < len(order):
+            v = order[i]
+            i = i+1
+            for table in tables:
+                w = table[v]
+                if w > 0 and not seen[w]:
+                    seen[w] = True
+                    order.append(w)
+    return np.array(order, dtype=np.int64)
+
+# Split the vertices into connected pieces of about size vertices: consecutive runs of
+# bfs_order()
+def bfs_partition(tables, size):
+    cluster = np.full(len(tables[0]), -1, dtype=np.int64)
+    order = bfs_order(tables)
+    cluster[order] = np.arange(len(order)) // size
+    return number_clusters(cluster)
+
+# The rank of each vertex inside its cluster, in breadth first order
+def ranks(tables, cluster):
+    sizes = np.bincount(cluster[1:])
+    order = bfs_order(tables)
+    order = order[np.argsort(cluster[order], kind='stable')] # grouped by cluster
+    rank = np.zeros(len(cluster), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - (np.cumsum(sizes) - sizes)[cluster[order]]
+    return rank
+
+# Split every cluster bigger than size into runs of size vertices in breadth first order,
+# e.g. to break up orbits too big to open in the browser
+def split_clusters(tables, cluster, size):
+    piece = ranks(tables, cluster) // size
+    return number_clusters(cluster * (piece.max() + 1) + piece)
+
+# The edges between clusters as arrays (from cluster, to cluster, label, number of edges)
+def quotient_edges(tables, cluster):
+    parts = []
+    for g, table in enumerate(tables):
+        table = np.asarray(table)
+        v = np.flatnonzero(table[1:] > 0) + 1
+        a, b = cluster[v], cluster[table[v]]
+        keep = a != b
+        parts.append(np.stack([a[keep], b[keep], np.full(keep.sum(), g+1)], axis=1))
+    edges, counts = np.unique(np.concatenate(parts), axis=0, return_counts=True)
+    return edges[:, 0], edges[:, 1], edges[:, 2], counts
+
+# Positions for the clustered view: the clusters are placed with place() on the graph of
+# clusters, spaced by their size, and the vertices of a cluster on a spiral around it,
+# in breadth first order inside the cluster so that neighbours stay close.
+# Returns the (n, 2) positions of the vertices and the (clusters, 2) positions of the clusters.
+def cluster_layout(tables, cluster, method='auto', scale=EDGE_LENGTH):
+    n = len(tables[0]) - 1
+    clusters = cluster.max() + 1
+    a, b, _, _ = quotient_edges(tables, cluster)
+    pairs = np.unique(np.stack([np.minimum(a, b), np.maximum(a, b)], axis=1), axis=0).reshape(-1, 2)
+    sizes = np.bincount(cluster[1:], minlength=clusters)
+    radius = scale/2 * np.sqrt(sizes)
+    centres = place(clusters, pairs, method, scale=2*np.median(radius) + scale)
+    rank = ranks(tables, cluster)
+    angle = rank[1:] * np.pi * (3 - np.sqrt(5)) # golden angle
+    r = scale/2 * np.sqrt(rank[1:])
+    positions = centres[cluster[1:]] + np.stack([r*np.cos(angle), r*np.sin(angle)], axis=1)
+    return positions, centres
+
+# Write a level of detail page: it opens on one node per cluster, with an edge for each
+# label between two clusters, and double clicking a cluster shows its vertices in place
+# (double clicking a vertex folds its cluster up again). cluster is from orbits() or
+# bfs_partition(); the clusters and their edges are all worked out here, not in the browser.
+def write_clustered_html(tables, path, cluster, method='auto', title='', height='1500px'):
+    positions, centres = cluster_layout(tables, cluster, method)
+    qa, qb, ql, qn = quotient_edges(tables, cluster)
+    with open(path, 'w') as f:
+        write_page_data(f, tables, path, positions, title, height)
+        for name, values in (('cluster', cluster), ('sizes', np.bincount(cluster[1:])),
+                             ('cx', np.round(centres[:, 0]).astype(np.int64)),
+                             ('cy', np.round(centres[:, 1]).astype(np.int64)),
+                             ('qa', qa), ('qb', qb), ('ql', ql), ('qn', qn)):
+            f.write(f'var {name} = ')
+            write_array(f, values)
+            f.write(';\n')
+        f.write(CLUSTER_TAIL)